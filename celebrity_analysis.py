@@ -1,24 +1,107 @@
 import requests
-import json
+import orjson
 import re
-from typing import Dict, Any
-from bs4 import BeautifulSoup
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from requests.adapters import HTTPAdapter
+
+# Enhanced keywords for race/ethnicity detection
+RACE_KEYWORDS = {
+    "African American/Black": [
+        "african american", "african-american", "black american", "black", 
+        "african descent", "nigerian", "kenyan", "jamaican", "haitian"
+    ],
+    "White/Caucasian": [
+        "caucasian", "white american", "european american", "white", 
+        "irish", "italian", "german", "english", "scottish", "french"
+    ],
+    "Hispanic/Latino": [
+        "hispanic", "latino", "latina", "latinx", "mexican", "puerto rican",
+        "cuban", "dominican", "spanish", "colombian", "venezuelan"
+    ],
+    "Asian": [
+        "asian", "chinese", "japanese", "korean", "vietnamese", "filipino",
+        "indian", "pakistani", "bangladeshi", "thai", "cambodian"
+    ],
+    "Mixed Race": [
+        "mixed race", "biracial", "multiracial", "mixed heritage"
+    ],
+    "Native American": [
+        "native american", "indigenous", "american indian", "cherokee", 
+        "navajo", "sioux", "apache"
+    ]
+}
+
+# Pronoun and race patterns are compiled once at import rather than per lookup.
+# They expect content that has already been lowercased.
+_PRONOUN_RE = re.compile(r'\b(he|his|him|she|her|hers)\b')
+_HE_PRONOUNS = ("he", "his", "him")
+_SHE_PRONOUNS = ("she", "her", "hers")
+
+# All race keywords fused into one scanner with a capture group per category,
+# in priority order. The zero-width lookahead tries every start position, so a
+# lower-priority phrase (e.g. "american indian") cannot hide a higher-priority
+# one that overlaps it (e.g. "indian").
+_RACES = list(RACE_KEYWORDS)
+_RACE_ALTERNATION = '|'.join(
+    '(' + '|'.join(re.escape(term) for term in terms) + ')'
+    for terms in RACE_KEYWORDS.values()
+)
+_RACE_SCAN_RE = re.compile(r'\b(?=(?:' + _RACE_ALTERNATION + r')\b)')
+# The birth-context fallback matches keywords anywhere, without word boundaries
+_RACE_SUBSTRING_SCAN_RE = re.compile(r'(?=(?:' + _RACE_ALTERNATION + r'))')
+
+# Upper bound on concurrent Wikipedia requests; matches the session's connection pool
+_MAX_FETCH_WORKERS = 8
+
+_BIRTH_CONTEXT_RE = re.compile(r'born to .{5,100}(family|parents|mother|father)')
+
+def _best_race(scanner: re.Pattern, text: str):
+    """Return the highest-priority race matched by scanner in text, or None"""
+    best = None
+    for match in scanner.finditer(text):
+        index = match.lastindex - 1
+        if best is None or index < best:
+            best = index
+            if best == 0:
+                break
+    return _RACES[best] if best is not None else None
 
 class CelebrityAnalyzer:
     def __init__(self):
         self.wiki_api_url = "https://en.wikipedia.org/w/api.php"
+        self._content_cache: Dict[str, str] = {}
+        # Reuse one keep-alive connection pool for all Wikipedia requests
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=_MAX_FETCH_WORKERS))
         
-    def get_celebrity_info(self, celebrity_name: str) -> Dict[str, Any]:
-        """Get comprehensive information about a celebrity using Wikipedia"""
+    def get_celebrity_info(self, celebrity_name: str, content: Optional[str] = None) -> Dict[str, Any]:
+        """Get comprehensive information about a celebrity using Wikipedia, reusing prefetched content if given"""
+        if content is None:
+            content = self._get_page_content(celebrity_name)
+        # Lowercase the page once, then share it between the heuristics
+        content = content.lower()
         info = {
             "name": celebrity_name,
-            "sex": self._get_sex(celebrity_name),
-            "race": self._get_race(celebrity_name),
+            "sex": self._get_sex(content),
+            "race": self._get_race(content),
         }
         return info
     
+    def get_many(self, celebrity_names: List[str]) -> Dict[str, str]:
+        """Fetch Wikipedia page content for several celebrities concurrently"""
+        # One worker per name so wall time is the slowest fetch, capped at the session's pool size
+        workers = max(1, min(len(celebrity_names), _MAX_FETCH_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = executor.map(self._get_page_content, celebrity_names)
+            return dict(zip(celebrity_names, contents))
+    
     def _get_page_content(self, celebrity_name: str) -> str:
         """Get Wikipedia page content for a celebrity"""
+        if celebrity_name in self._content_cache:
+            return self._content_cache[celebrity_name]
+        
         # Get the page ID
         params = {
             "action": "query",
@@ -29,31 +112,34 @@ class CelebrityAnalyzer:
         }
         
         try:
-            response = requests.get(self.wiki_api_url, params=params)
+            response = self.session.get(self.wiki_api_url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             if "query" in data and "search" in data["query"] and data["query"]["search"]:
                 page_title = data["query"]["search"][0]["title"]
                 
-                # Get the page content - full page to better detect race
+                # Get the full page as server-side extracted plain text
                 params = {
-                    "action": "parse",
+                    "action": "query",
                     "format": "json",
-                    "page": page_title,
-                    "prop": "text",
+                    "prop": "extracts",
+                    "explaintext": 1,
+                    "titles": page_title,
+                    "redirects": 1,
                     "utf8": 1
                 }
                 
-                response = requests.get(self.wiki_api_url, params=params)
+                response = self.session.get(self.wiki_api_url, params=params)
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
-                if "parse" in data and "text" in data["parse"]:
-                    html_content = data["parse"]["text"]["*"]
-                    # Parse HTML to plain text
-                    soup = BeautifulSoup(html_content, "html.parser")
-                    return soup.get_text()
+                if "query" in data and "pages" in data["query"]:
+                    page = next(iter(data["query"]["pages"].values()))
+                    if "extract" in page:
+                        content = page["extract"]
+                        self._content_cache[celebrity_name] = content
+                        return content
             
             return f"No Wikipedia information found for {celebrity_name}"
         
@@ -61,13 +147,12 @@ class CelebrityAnalyzer:
             print(f"Error fetching Wikipedia data for {celebrity_name}: {e}")
             return f"Error fetching information for {celebrity_name}"
     
-    def _get_sex(self, celebrity_name: str) -> str:
-        """Guess sex/gender information about the celebrity"""
-        content = self._get_page_content(celebrity_name)
-        
-        # Simple heuristic looking for pronouns
-        he_count = len(re.findall(r'\bhe\b|\bhis\b|\bhim\b', content.lower()))
-        she_count = len(re.findall(r'\bshe\b|\bher\b|\bhers\b', content.lower()))
+    def _get_sex(self, content: str) -> str:
+        """Guess sex/gender information from the lowercased page content"""
+        # Simple heuristic looking for pronouns, counted in a single pass
+        counts = Counter(_PRONOUN_RE.findall(content))
+        he_count = sum(counts[pronoun] for pronoun in _HE_PRONOUNS)
+        she_count = sum(counts[pronoun] for pronoun in _SHE_PRONOUNS)
         
         if he_count > she_count:
             return "Male"
@@ -76,53 +161,19 @@ class CelebrityAnalyzer:
         else:
             return "Unknown"
     
-    def _get_race(self, celebrity_name: str) -> str:
-        """Try to determine race/ethnicity information with improved detection"""
-        content = self._get_page_content(celebrity_name)
-        
-        # Enhanced keywords for race/ethnicity detection
-        keywords = {
-            "African American/Black": [
-                "african american", "african-american", "black american", "black", 
-                "african descent", "nigerian", "kenyan", "jamaican", "haitian"
-            ],
-            "White/Caucasian": [
-                "caucasian", "white american", "european american", "white", 
-                "irish", "italian", "german", "english", "scottish", "french"
-            ],
-            "Hispanic/Latino": [
-                "hispanic", "latino", "latina", "latinx", "mexican", "puerto rican",
-                "cuban", "dominican", "spanish", "colombian", "venezuelan"
-            ],
-            "Asian": [
-                "asian", "chinese", "japanese", "korean", "vietnamese", "filipino",
-                "indian", "pakistani", "bangladeshi", "thai", "cambodian"
-            ],
-            "Mixed Race": [
-                "mixed race", "biracial", "multiracial", "mixed heritage"
-            ],
-            "Native American": [
-                "native american", "indigenous", "american indian", "cherokee", 
-                "navajo", "sioux", "apache"
-            ]
-        }
-        
-        # Check for specific race mentions
-        for race, terms in keywords.items():
-            for term in terms:
-                # Use word boundaries to avoid substring matches
-                pattern = r'\b' + re.escape(term) + r'\b'
-                if re.search(pattern, content.lower()):
-                    return race
+    def _get_race(self, content: str) -> str:
+        """Try to determine race/ethnicity information from the lowercased page content"""
+        # Check for specific race mentions in one pass; the earliest category wins
+        race = _best_race(_RACE_SCAN_RE, content)
+        if race:
+            return race
                 
         # Check for "born to" or "parents" context which often mentions ethnicity
-        birth_context = re.search(r'born to .{5,100}(family|parents|mother|father)', content.lower())
+        birth_context = _BIRTH_CONTEXT_RE.search(content)
         if birth_context:
-            context = birth_context.group(0).lower()
-            for race, terms in keywords.items():
-                for term in terms:
-                    if term in context:
-                        return race
+            race = _best_race(_RACE_SUBSTRING_SCAN_RE, birth_context.group(0))
+            if race:
+                return race
                         
         return "Information not available"
 
@@ -145,12 +196,13 @@ def main():
     
     analyzer = CelebrityAnalyzer()
     
-    # Get information for each celebrity
+    # Fetch all pages up front so the network round-trips overlap
     print("Analyzing celebrities...\n")
+    print(f"Getting information about {', '.join(bad_celebrities)}...")
+    contents = analyzer.get_many(bad_celebrities)
     
     for celebrity in bad_celebrities:
-        print(f"Getting information about {celebrity}...")
-        info = analyzer.get_celebrity_info(celebrity)
+        info = analyzer.get_celebrity_info(celebrity, contents[celebrity])
         
         print(f"\n{'='*50}\n")
         print(f"CELEBRITY: {celebrity}")
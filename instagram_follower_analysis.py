@@ -1,104 +1,118 @@
-import json
 import argparse
+import ijson
+import orjson
 import pandas as pd
 import re
 import unicodedata
 import os
 from collections import defaultdict
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import time
-import importlib.util
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
-def load_json_data(file_path):
-    """Load JSON data from file"""
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return json.load(file)
+PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
 
-def extract_follower_names(data):
-    """Extract follower names from the Instagram JSON data structure"""
-    followers = []
-    
-    # Check if we have a proper structure with related_profiles
-    if 'node' in data and 'edge_related_profiles' in data['node']:
-        related_profiles = data['node']['edge_related_profiles']['edges']
-        
-        for profile in related_profiles:
-            if 'node' in profile:
-                username = profile['node'].get('username', '')
-                full_name = profile['node'].get('full_name', '')
-                
+# Concurrent Perplexity requests; the session keeps one warm connection per worker
+PERPLEXITY_MAX_WORKERS = 4
+PERPLEXITY_TIMEOUT = 60.0
+
+# Shared session so repeated Perplexity calls reuse the same connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=PERPLEXITY_MAX_WORKERS))
+
+# Fields recorded for a profile that has no Perplexity result
+_UNANALYZED = {
+    'predicted_gender': 'unknown',
+    'predicted_race': 'unknown',
+    'confidence': 'none',
+    'analysis_source': 'error'
+}
+
+# Profiles sent per Perplexity request; keeps each response well under max_tokens
+PERPLEXITY_BATCH_SIZE = 50
+
+# Keywords that indicate non-human entities
+NON_HUMAN_KEYWORDS = frozenset({
+    'ucla', 'store', 'club', 'official', 'university', 'association', 'group',
+    'organization', 'school', 'community', 'foundation', 'society', 'team',
+    'committee', 'company', 'inc', 'corp', 'llc', 'the',
+    'enabler', 'athletics', 'admission', 'engineering', 'barstool',
+    'den', 'backpacking', 'sjp', 'shop', 'tuned', 'metronome', 'samueli', 
+    'undergraduate', 'what\'s bruin', 'berkeley'
+})
+
+# Whole-token match of any non-human keyword, for vectorized filtering
+_NON_HUMAN_PATTERN = r'(?<!\S)(?:' + '|'.join(re.escape(k) for k in sorted(NON_HUMAN_KEYWORDS)) + r')(?!\S)'
+
+# Matches an uncommented PERPLEXITY_API_KEY = "..." assignment in api_config.py
+_API_KEY_RE = re.compile(r'^\s*PERPLEXITY_API_KEY\s*=\s*(["\'])(.*?)\1', re.M)
+
+# Translation table deleting every ASCII character that is neither a letter nor whitespace
+_STRIP_NON_NAME_CHARS = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if not (chr(c).isalpha() or chr(c).isspace())
+))
+
+def iter_followers(file_path):
+    """Stream follower profiles from an Instagram JSON export without loading the whole file"""
+    with open(file_path, 'rb') as file:
+        # Only the related_profiles edges are materialized, one profile at a time
+        for profile in ijson.items(file, 'node.edge_related_profiles.edges.item'):
+            node = profile.get('node')
+            if node is None:
+                continue
+            
+            yield {
+                'username': node.get('username', ''),
+                'full_name': node.get('full_name', ''),
                 # Get profile picture URL if available
-                profile_pic_url = profile['node'].get('profile_pic_url', '')
-                
-                followers.append({
-                    'username': username,
-                    'full_name': full_name,
-                    'profile_pic_url': profile_pic_url
-                })
-    
-    return followers
+                'profile_pic_url': node.get('profile_pic_url', '')
+            }
 
 def normalize_name(name):
     """Normalize name by removing emojis and special characters"""
-    # Remove emojis and other special characters
-    name = ''.join(c for c in name if c.isalpha() or c.isspace())
-    # Normalize unicode characters
+    # Normalize unicode characters first; this also drops emojis and other non-ASCII
     name = unicodedata.normalize('NFKD', name).encode('ASCII', 'ignore').decode('ASCII')
+    # Remove the remaining special characters in a single C-level pass
+    name = name.translate(_STRIP_NON_NAME_CHARS)
     return name.strip()
 
-def is_human_name(name):
-    """Check if a name appears to be a human name rather than an organization or business"""
-    # Normalize and lowercase the name
-    norm_name = normalize_name(name).lower()
+def human_name_mask(names):
+    """Return a boolean Series that is True for names that look human rather than an organization or business"""
+    names = pd.Series(names, dtype=object).fillna('')
     
-    # List of keywords that indicate non-human entities
-    non_human_keywords = [
-        'ucla', 'store', 'club', 'official', 'university', 'association', 'group',
-        'organization', 'school', 'community', 'foundation', 'society', 'team',
-        'committee', 'company', 'inc', 'corp', 'llc', 'association', 'the',
-        'enabler', 'athletics', 'admission', 'engineering', 'barstool', 'school',
-        'den', 'backpacking', 'sjp', 'shop', 'tuned', 'metronome', 'samueli', 
-        'undergraduate', 'what\'s bruin', 'berkeley', 'official'
-    ]
+    # Same normalization as normalize_name, applied to every name at once
+    norm_names = (
+        names.str.normalize('NFKD')
+        .str.encode('ASCII', 'ignore')
+        .str.decode('ASCII')
+        .str.translate(_STRIP_NON_NAME_CHARS)
+        .str.lower()
+    )
+    has_keyword = norm_names.str.contains(_NON_HUMAN_PATTERN, regex=True, na=False)
     
-    # Check for keywords indicating an organization/business
-    for keyword in non_human_keywords:
-        if keyword in norm_name.split():
-            return False
+    # All-uppercase names are common for organizations
+    all_upper = names.str.isupper() & (names.str.len() > 3)
     
-    # Check if the name is in all uppercase (common for organizations)
-    if name.isupper() and len(name) > 3:
-        return False
-        
-    # If we passed all checks, it's likely a human name
-    return True
+    return ~(has_keyword | all_upper)
 
-def analyze_with_perplexity_bulk(followers, api_key):
-    """Use Perplexity API to analyze gender and ethnicity in a single batch to minimize API usage"""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-    
-    url = "https://api.perplexity.ai/chat/completions"
-    
-    # Prepare data for all followers in one batch
-    followers_data = []
-    for i, person in enumerate(followers):
-        followers_data.append({
-            "id": i,
-            "username": person.get('username', ''),
-            "full_name": person.get('full_name', '')
-        })
-    
-    # Create a concise JSON prompt with all profiles
-    followers_json = json.dumps(followers_data, ensure_ascii=False)
+def is_human_name(name):
+    """Check if a name appears to be a human name rather than an organization or business"""
+    return bool(human_name_mask([name]).iloc[0])
+
+def _call_perplexity(batch, headers):
+    """Analyze one batch of followers; return the list of results, empty on failure"""
+    # Serialize profiles as compact [id, username, full_name] rows rather than per-follower dicts.
+    # Ids are local to the batch (0..len-1), matching how models tend to number each answer.
+    followers_json = orjson.dumps([
+        (i, person.get('username', ''), person.get('full_name', '')) for i, person in enumerate(batch)
+    ]).decode()
     
-    prompt = f"""Determine gender and ethnicity for these Instagram profiles. Given the size limit, I'll process all at once.
+    prompt = f"""Determine gender and ethnicity for these Instagram profiles.
 
-JSON Profiles:
+JSON Profiles (each one is an [id, username, full_name] array):
 {followers_json}
 
 For EACH profile, determine:
@@ -118,8 +132,6 @@ Return a JSON array with results in this exact format, with one object per profi
 
 Be concise. Format must be parseable JSON without extra text."""
 
-    print(f"Analyzing {len(followers)} profiles in a single API call...")
-    
     try:
         payload = {
             "model": "sonar-pro",
@@ -131,82 +143,88 @@ Be concise. Format must be parseable JSON without extra text."""
             "max_tokens": 4000
         }
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = _SESSION.post(PERPLEXITY_API_URL, headers=headers, data=orjson.dumps(payload), timeout=PERPLEXITY_TIMEOUT)
         
-        if response.status_code == 200:
-            response_data = response.json()
-            result_text = response_data["choices"][0]["message"]["content"]
-            
-            # Extract JSON data
-            try:
-                # Clean up the response if needed
-                result_text = result_text.strip()
-                if result_text.startswith("```json"):
-                    result_text = result_text[7:-3]  # Remove ```json and ```
-                elif result_text.startswith("```"):
-                    result_text = result_text[3:-3]  # Remove ``` and ```
-                    
-                # Parse the results
-                analysis_results = json.loads(result_text)
-                
-                # Create a lookup by ID
-                results_by_id = {item.get('id'): item for item in analysis_results}
-                
-                # Apply results back to original follower data
-                for i, person in enumerate(followers):
-                    if i in results_by_id:
-                        result = results_by_id[i]
-                        person['predicted_gender'] = result.get('gender', 'unknown')
-                        person['predicted_race'] = result.get('ethnicity', 'unknown')
-                        person['confidence'] = result.get('confidence', 'low')
-                        person['analysis_source'] = 'perplexity'
-                    else:
-                        person['predicted_gender'] = 'unknown'
-                        person['predicted_race'] = 'unknown'
-                        person['confidence'] = 'none'
-                        person['analysis_source'] = 'error'
-                
-                print(f"Successfully analyzed {len(results_by_id)} profiles")
-                
-            except json.JSONDecodeError as e:
-                print(f"Error parsing Perplexity response: {e}")
-                print(f"Raw response: {result_text}")
-                # Mark all as unknown
-                for person in followers:
-                    person['predicted_gender'] = 'unknown'
-                    person['predicted_race'] = 'unknown'
-                    person['analysis_source'] = 'error'
-        else:
+        if response.status_code != 200:
             print(f"API error: {response.status_code}")
             print(f"Response: {response.text}")
-            # Mark all as unknown
-            for person in followers:
-                person['predicted_gender'] = 'unknown'
-                person['predicted_race'] = 'unknown'
-                person['analysis_source'] = 'error'
+            return []
+        
+        response_data = orjson.loads(response.content)
+        result_text = response_data["choices"][0]["message"]["content"]
+        
+        # Extract JSON data
+        try:
+            # Clean up the response if needed
+            result_text = result_text.strip()
+            if result_text.startswith("```json"):
+                result_text = result_text[7:-3]  # Remove ```json and ```
+            elif result_text.startswith("```"):
+                result_text = result_text[3:-3]  # Remove ``` and ```
+                
+            # Parse the results
+            analysis_results = orjson.loads(result_text)
+        except orjson.JSONDecodeError as e:
+            print(f"Error parsing Perplexity response: {e}")
+            print(f"Raw response: {result_text}")
+            return []
+        
+        # Keep only well-formed result objects
+        return [item for item in analysis_results if isinstance(item, dict)]
     
     except Exception as e:
         print(f"Exception during API call: {e}")
-        # Mark all as unknown
-        for person in followers:
-            person['predicted_gender'] = 'unknown'
-            person['predicted_race'] = 'unknown'
-            person['analysis_source'] = 'error'
+        return []
+
+def analyze_with_perplexity_bulk(followers, api_key):
+    """Use Perplexity API to analyze gender and ethnicity in concurrent batches of profiles"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Accept": "application/json",
+        "Content-Type": "application/json"
+    }
+    
+    # Split into batches so a truncated or malformed response only loses one batch
+    batches = [followers[start:start + PERPLEXITY_BATCH_SIZE] for start in range(0, len(followers), PERPLEXITY_BATCH_SIZE)]
+    
+    print(f"Analyzing {len(followers)} profiles in {len(batches)} API calls...")
+    
+    # Every profile starts out unanalyzed; results then overwrite their follower by batch-local ID
+    for person in followers:
+        person.update(_UNANALYZED)
+    
+    analyzed = 0
+    with ThreadPoolExecutor(max_workers=PERPLEXITY_MAX_WORKERS) as executor:
+        all_results = executor.map(functools.partial(_call_perplexity, headers=headers), batches)
+        for batch, batch_results in zip(batches, all_results):
+            # Ids index into the originating batch, so a result can only update its own profiles
+            for result in batch_results:
+                i = result.get('id')
+                # bool is an int subclass, and True would otherwise resolve to id 1
+                if type(i) is not int or not 0 <= i < len(batch):
+                    continue
+                person = batch[i]
+                if person['analysis_source'] != 'perplexity':
+                    analyzed += 1
+                person['predicted_gender'] = result.get('gender', 'unknown')
+                person['predicted_race'] = result.get('ethnicity', 'unknown')
+                person['confidence'] = result.get('confidence', 'low')
+                person['analysis_source'] = 'perplexity'
+    
+    print(f"Successfully analyzed {analyzed} profiles")
     
     return followers
 
+@functools.lru_cache(maxsize=1)
 def load_api_key():
     """Attempt to load the Perplexity API key from api_config.py"""
     try:
-        # Try to import api_config module
-        spec = importlib.util.spec_from_file_location("api_config", "api_config.py")
-        if spec and spec.loader:
-            api_config = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(api_config)
-            return getattr(api_config, "PERPLEXITY_API_KEY", "")
-        return ""
-    except (ImportError, FileNotFoundError):
-        print("api_config.py not found or couldn't be imported")
+        # Read the assignment directly instead of importing (and executing) the file
+        with open("api_config.py", 'r', encoding='utf-8') as file:
+            match = _API_KEY_RE.search(file.read())
+        return match.group(2) if match else ""
+    except FileNotFoundError:
+        print("api_config.py not found or couldn't be read")
         return ""
 
 def main():
@@ -224,19 +242,17 @@ def main():
     if not api_key:
         print("Warning: No Perplexity API key found. Please provide one via --api-key argument, PERPLEXITY_API_KEY environment variable, or in api_config.py")
     
-    # Load data
+    # Stream follower names out of the export
     print(f"Loading data from {args.input}...")
-    data = load_json_data(args.input)
-    
-    # Extract follower names
     print("Extracting follower names...")
-    followers = extract_follower_names(data)
+    followers = list(iter_followers(args.input))
     print(f"Found {len(followers)} follower profiles")
     
     # Filter for human accounts if requested
     if args.human_only:
         print("Filtering for human accounts...")
-        human_followers = [f for f in followers if is_human_name(f['full_name'])]
+        is_human = human_name_mask([f['full_name'] for f in followers])
+        human_followers = [f for f, keep in zip(followers, is_human) if keep]
         print(f"Filtered to {len(human_followers)} human accounts (removed {len(followers) - len(human_followers)} non-human accounts)")
         followers = human_followers
     
@@ -260,8 +276,8 @@ def main():
     
     # Save to output file if specified
     if args.output:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(followers, f, indent=2, ensure_ascii=False)
+        with open(args.output, 'wb') as f:
+            f.write(orjson.dumps(followers, option=orjson.OPT_INDENT_2))
         print(f"\nResults saved to {args.output}")
 
 if __name__ == "__main__":